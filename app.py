@@ -2,8 +2,9 @@
 # app.py
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from cord19_analysis import CORD19Analyzer
+import altair as alt
+from wordcloud import WordCloud
+from cord19_analysis import CORD19Analyzer, count_title_words
 import sys
 import os
 
@@ -15,6 +16,98 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+WORDCLOUD_OPTIONS = dict(width=800, height=400, background_color='white', max_words=100)
+PREVIEW_ROWS = 10_000
+
+# The analyzers are loaded lazily, once per server process, by the first
+# section that needs them. Failures raise so they are not cached: a missing
+# file raises FileNotFoundError and a file with no rows raises ValueError.
+# Only one full analyzer is kept, so switching low-memory mode evicts the other.
+@st.cache_resource(max_entries=1, show_spinner="Loading and cleaning the CORD-19 dataset...")
+def get_analyzer(low_memory):
+    """Load the full dataset (or its streamed aggregates in low-memory mode)"""
+    analyzer = CORD19Analyzer('metadata.csv')
+    if low_memory:
+        loaded = analyzer.load_and_aggregate()
+    else:
+        loaded = analyzer.load_data()
+        if loaded and analyzer.df.empty:
+            raise ValueError(f"File {analyzer.file_path} contains no rows.")
+        if loaded:
+            analyzer.clean_data()
+    if not loaded:
+        raise FileNotFoundError(analyzer.file_path)
+    return analyzer
+
+@st.cache_resource(show_spinner="Loading a preview of the CORD-19 dataset...")
+def get_preview_analyzer():
+    """Load only the first PREVIEW_ROWS rows for the overview page"""
+    analyzer = CORD19Analyzer('metadata.csv')
+    if not analyzer.load_preview(PREVIEW_ROWS):
+        raise FileNotFoundError(analyzer.file_path)
+    if analyzer.df.empty:
+        raise ValueError(f"File {analyzer.file_path} contains no rows.")
+    return analyzer
+
+def ranked_table(counts, label):
+    """Turn top-n counts into a table ranked from 1 for st.dataframe"""
+    return pd.DataFrame(
+        {label: counts.index.astype(str), 'Papers': counts.to_numpy()},
+        index=pd.RangeIndex(1, len(counts) + 1, name='Rank')
+    )
+
+def show_load_error():
+    st.error("Could not load the dataset. Please make sure 'metadata.csv' is in the correct directory.")
+
+def show_empty_error():
+    st.error("The dataset 'metadata.csv' contains no rows. Please check that the file is complete.")
+
+# Cached computations: df_clean never changes after clean_data(), so these
+# only do the pandas work once per unique set of widget values
+@st.cache_data
+def compute_yearly_counts(df_clean):
+    """Count publications per year, indexed by year so ranges can be sliced"""
+    return df_clean['year'].value_counts().sort_index()
+
+@st.cache_data
+def compute_journal_counts(df_clean):
+    """Count papers per journal, unsorted; callers take nlargest(n) for the top n"""
+    return df_clean.groupby('journal_clean', observed=True).size().rename('count')
+
+@st.cache_data
+def compute_source_counts(df_clean):
+    """Count papers per source, unsorted; callers take nlargest(n) for the top n"""
+    return df_clean.groupby('source_x', observed=True).size().rename('count')
+
+def title_cache_key(df_clean):
+    """Cheap invalidation key for title-derived results (avoids hashing all titles)"""
+    return len(df_clean), str(df_clean['title'].iloc[0])
+
+@st.cache_data
+def compute_title_word_counts(title_key, _df_clean):
+    """Count stopword-filtered title words once for the word cloud and top-words list"""
+    return count_title_words(_df_clean['title'])
+
+@st.cache_resource
+def build_wordcloud(counts_key, _word_counts):
+    """Render the word cloud from title word counts (keyed on counts_key only)"""
+    frequencies = _word_counts.head(WORDCLOUD_OPTIONS['max_words']).to_dict()
+    wordcloud = WordCloud(**WORDCLOUD_OPTIONS).generate_from_frequencies(frequencies)
+    return wordcloud.to_array()
+
+def get_counts(name, compute):
+    """Return streamed aggregates in low-memory mode, otherwise the cached computation"""
+    analyzer = st.session_state.analyzer
+    if analyzer.aggregates is not None:
+        return analyzer.aggregates[name]
+    return compute(analyzer.df_clean)
+
+def get_total_rows(analyzer):
+    """Number of rows in the loaded dataset (df only holds a sample in low-memory mode)"""
+    if analyzer.aggregates is not None:
+        return analyzer.aggregates['n_rows']
+    return analyzer.df.shape[0]
+
 def main():
     st.title("📊 CORD-19 COVID-19 Research Data Explorer")
     st.write("""
@@ -22,13 +115,11 @@ def main():
     which contains metadata about COVID-19 research papers.
     """)
     
-    # Initialize analyzer
-    if 'analyzer' not in st.session_state:
-        st.session_state.analyzer = CORD19Analyzer('metadata.csv')
-        if not st.session_state.analyzer.load_data():
-            st.error("Could not load the dataset. Please make sure 'metadata.csv' is in the correct directory.")
-            return
-        st.session_state.analyzer.clean_data()
+    # Low-memory mode streams the CSV in chunks and keeps only aggregates
+    low_memory = st.sidebar.checkbox(
+        "Low-memory mode",
+        help="Read metadata.csv in chunks and keep only counts plus a row sample"
+    )
     
     # Sidebar for controls
     st.sidebar.title("Navigation")
@@ -37,9 +128,22 @@ def main():
         ["Dataset Overview", "Publication Trends", "Journal Analysis", "Title Analysis", "Source Analysis", "Raw Data"]
     )
     
+    # Each section is an st.fragment, so its own widgets rerun only that section
     if section == "Dataset Overview":
         show_dataset_overview()
-    elif section == "Publication Trends":
+        return
+    
+    # Every other section needs the full dataset, loaded on first use
+    try:
+        st.session_state.analyzer = get_analyzer(low_memory)
+    except FileNotFoundError:
+        show_load_error()
+        return
+    except ValueError:
+        show_empty_error()
+        return
+    
+    if section == "Publication Trends":
         show_publication_trends()
     elif section == "Journal Analysis":
         show_journal_analysis()
@@ -50,35 +154,54 @@ def main():
     elif section == "Raw Data":
         show_raw_data()
 
+@st.fragment
 def show_dataset_overview():
     st.header("📋 Dataset Overview")
     
+    # Use the full dataset once another section has loaded it, otherwise a
+    # quick preview of the first rows so the page appears immediately
+    analyzer = st.session_state.get('analyzer')
+    if analyzer is None:
+        try:
+            analyzer = get_preview_analyzer()
+        except FileNotFoundError:
+            show_load_error()
+            return
+        except ValueError:
+            show_empty_error()
+            return
+        st.info(f"Showing the first {PREVIEW_ROWS:,} rows. Open another section to load the full dataset.")
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Basic Information")
-        st.write(f"**Total rows:** {st.session_state.analyzer.df.shape[0]:,}")
-        st.write(f"**Total columns:** {st.session_state.analyzer.df.shape[1]}")
+        total_rows = get_total_rows(analyzer)
+        st.write(f"**Total rows:** {total_rows:,}")
+        st.write(f"**Total columns:** {analyzer.df.shape[1]}")
         
         # Show missing values
-        missing_data = st.session_state.analyzer.df.isnull().sum()
+        missing_data = analyzer.missing_summary
         st.subheader("Missing Values")
         for col, missing_count in missing_data[missing_data > 0].head(10).items():
-            st.write(f"- **{col}:** {missing_count:,} missing ({missing_count/st.session_state.analyzer.df.shape[0]*100:.1f}%)")
+            st.write(f"- **{col}:** {missing_count:,} missing ({missing_count/total_rows*100:.1f}%)")
     
     with col2:
         st.subheader("First 10 Rows")
-        st.dataframe(st.session_state.analyzer.df.head(10))
+        st.dataframe(analyzer.df.head(10))
     
     st.subheader("Data Types")
-    st.write(st.session_state.analyzer.df.dtypes)
+    st.write(analyzer.dtypes_cache)
 
+@st.fragment
 def show_publication_trends():
     st.header("📈 Publication Trends Over Time")
     
+    yearly_all = get_counts('yearly_counts', compute_yearly_counts)
+    
     # Year range selector
-    min_year = int(st.session_state.analyzer.df_clean['year'].min())
-    max_year = int(st.session_state.analyzer.df_clean['year'].max())
+    min_year = st.session_state.analyzer.year_min
+    max_year = st.session_state.analyzer.year_max
     
     year_range = st.slider(
         "Select year range:",
@@ -87,87 +210,75 @@ def show_publication_trends():
         value=(min_year, max_year)
     )
     
-    # Filter data by year range
-    filtered_data = st.session_state.analyzer.df_clean[
-        (st.session_state.analyzer.df_clean['year'] >= year_range[0]) & 
-        (st.session_state.analyzer.df_clean['year'] <= year_range[1])
-    ]
-    
-    yearly_counts = filtered_data['year'].value_counts().sort_index()
+    # Slice the precomputed per-year counts instead of filtering every row
+    yearly_counts = yearly_all.loc[year_range[0]:year_range[1]]
+    total_publications = int(yearly_counts.sum())
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Publications by Year")
-        fig, ax = plt.subplots(figsize=(10, 6))
-        yearly_counts.plot(kind='bar', color='skyblue', ax=ax)
-        ax.set_title('Number of COVID-19 Publications by Year')
-        ax.set_xlabel('Year')
-        ax.set_ylabel('Number of Publications')
-        plt.xticks(rotation=45)
-        st.pyplot(fig)
+        st.bar_chart(yearly_counts, x_label='Year', y_label='Number of Publications', color='#87ceeb')
     
     with col2:
         st.subheader("Summary Statistics")
-        st.write(f"**Total publications in range:** {len(filtered_data):,}")
+        st.write(f"**Total publications in range:** {total_publications:,}")
         st.write(f"**Average publications per year:** {yearly_counts.mean():.0f}")
         st.write(f"**Year with most publications:** {yearly_counts.idxmax()} ({yearly_counts.max():,} papers)")
         
         st.subheader("Yearly Counts")
-        for year, count in yearly_counts.items():
-            st.write(f"- **{year}:** {count:,} publications")
+        st.dataframe(yearly_counts.to_frame('Publications'))
 
+@st.fragment
 def show_journal_analysis():
     st.header("🏥 Journal Analysis")
     
     top_n = st.slider("Number of top journals to show:", 5, 20, 10)
     
-    top_journals = st.session_state.analyzer.df_clean['journal_clean'].value_counts().head(top_n)
+    journal_counts = get_counts('journal_counts', compute_journal_counts)
+    top_journals = journal_counts.nlargest(top_n)
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader(f"Top {top_n} Journals")
-        fig, ax = plt.subplots(figsize=(10, 8))
-        top_journals.plot(kind='barh', color='lightgreen', ax=ax)
-        ax.set_title(f'Top {top_n} Journals Publishing COVID-19 Research')
-        ax.set_xlabel('Number of Publications')
-        st.pyplot(fig)
+        chart = alt.Chart(top_journals.reset_index()).mark_bar(color='lightgreen').encode(
+            x=alt.X('count:Q', title='Number of Publications'),
+            y=alt.Y('journal_clean:N', sort='-x', title=None),
+            tooltip=['journal_clean', 'count']
+        )
+        st.altair_chart(chart)
     
     with col2:
         st.subheader("Journal Statistics")
-        st.write(f"**Total unique journals:** {st.session_state.analyzer.df_clean['journal_clean'].nunique():,}")
+        st.write(f"**Total unique journals:** {len(journal_counts):,}")
         st.write(f"**Journal with most publications:** {top_journals.index[0]} ({top_journals.iloc[0]:,} papers)")
         
         st.subheader("Top Journals List")
-        for i, (journal, count) in enumerate(top_journals.items(), 1):
-            st.write(f"{i}. **{journal.title()}:** {count:,} papers")
+        st.dataframe(ranked_table(top_journals.set_axis(top_journals.index.astype(str).str.title()), 'Journal'))
 
+@st.fragment
 def show_title_analysis():
     st.header("📝 Title Analysis")
     
     st.subheader("Word Cloud of Paper Titles")
     
-    # Generate word cloud
-    titles = ' '.join(st.session_state.analyzer.df_clean['title'].dropna().astype(str))
-    
-    wordcloud = WordCloud(
-        width=800, 
-        height=400, 
-        background_color='white',
-        max_words=100
-    ).generate(titles)
+    # One set of word counts feeds both the word cloud and the top-words list
+    aggregates = st.session_state.analyzer.aggregates
+    if aggregates is not None:
+        counts_key = ('streamed', aggregates['n_rows'])
+        word_counts = aggregates['title_word_counts']
+    else:
+        counts_key = title_cache_key(st.session_state.analyzer.df_clean)
+        word_counts = compute_title_word_counts(counts_key, st.session_state.analyzer.df_clean)
     
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.imshow(wordcloud, interpolation='bilinear')
-    ax.axis('off')
-    ax.set_title('Most Frequent Words in Paper Titles')
-    st.pyplot(fig)
+    # Generate word cloud (rendered once and reused across reruns)
+    wordcloud = build_wordcloud(counts_key, word_counts)
+    st.image(wordcloud, caption='Most Frequent Words in Paper Titles')
     
     # Simple word frequency analysis
     st.subheader("Top Words in Titles")
-    words = ' '.join(st.session_state.analyzer.df_clean['title'].dropna().astype(str)).lower().split()
-    word_freq = pd.Series(words).value_counts().head(20)
+    word_freq = word_counts.head(20)
     
     col1, col2 = st.columns(2)
     with col1:
@@ -180,29 +291,34 @@ def show_title_analysis():
         for word, freq in word_freq.tail(10).items():
             st.write(f"- **{word}:** {freq:,}")
 
+@st.fragment
 def show_source_analysis():
     st.header("🌐 Source Analysis")
     
-    source_counts = st.session_state.analyzer.df_clean['source_x'].value_counts().head(10)
+    all_source_counts = get_counts('source_counts', compute_source_counts)
+    source_counts = all_source_counts.nlargest(10)
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Distribution by Source")
-        fig, ax = plt.subplots(figsize=(10, 8))
-        plt.pie(source_counts.values, labels=source_counts.index, autopct='%1.1f%%')
-        plt.title('Distribution of Papers by Source (Top 10)')
-        st.pyplot(fig)
+        source_share = source_counts.reset_index().assign(share=source_counts.to_numpy() / source_counts.sum())
+        chart = alt.Chart(source_share).mark_arc().encode(
+            theta=alt.Theta('count:Q'),
+            color=alt.Color('source_x:N', sort=source_share['source_x'].tolist(), title='Source (Top 10)'),
+            tooltip=['source_x', 'count', alt.Tooltip('share:Q', format='.1%')]
+        )
+        st.altair_chart(chart)
     
     with col2:
         st.subheader("Source Statistics")
-        st.write(f"**Total unique sources:** {st.session_state.analyzer.df_clean['source_x'].nunique():,}")
+        st.write(f"**Total unique sources:** {len(all_source_counts):,}")
         st.write(f"**Largest source:** {source_counts.index[0]} ({source_counts.iloc[0]:,} papers)")
         
         st.subheader("Top Sources")
-        for i, (source, count) in enumerate(source_counts.items(), 1):
-            st.write(f"{i}. **{source}:** {count:,} papers")
+        st.dataframe(ranked_table(source_counts, 'Source'))
 
+@st.fragment
 def show_raw_data():
     st.header("📄 Raw Data Explorer")
     
@@ -220,18 +336,19 @@ def show_raw_data():
     )
     
     if selected_columns:
-        st.dataframe(st.session_state.analyzer.df_clean[selected_columns].head(rows_to_show))
+        # Take the rows first so only rows_to_show rows are projected
+        st.dataframe(st.session_state.analyzer.df_clean.head(rows_to_show).loc[:, selected_columns])
     
     # Data summary
     st.subheader("Data Summary")
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Total Papers", f"{st.session_state.analyzer.df_clean.shape[0]:,}")
+        st.metric("Total Papers", f"{get_total_rows(st.session_state.analyzer):,}")
     with col2:
         st.metric("Columns", st.session_state.analyzer.df_clean.shape[1])
     with col3:
-        st.metric("Years Covered", f"{int(st.session_state.analyzer.df_clean['year'].min())} - {int(st.session_state.analyzer.df_clean['year'].max())}")
+        st.metric("Years Covered", f"{st.session_state.analyzer.year_min} - {st.session_state.analyzer.year_max}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
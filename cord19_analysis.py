@@ -2,32 +2,208 @@
 # cord19_analysis.py
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+import os
 import re
 from collections import Counter
+from itertools import chain
 import wordcloud
-from wordcloud import WordCloud
+from wordcloud import WordCloud, STOPWORDS
 import warnings
 warnings.filterwarnings('ignore')
 
+# Copy-on-Write lets the cleaned frame share unchanged columns with the raw
+# frame instead of copying them (always on from pandas 3.0)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Only the columns the analysis uses are read from metadata.csv
+METADATA_COLUMNS = ['title', 'abstract', 'journal', 'publish_time', 'source_x']
+METADATA_DTYPES = {
+    'title': 'string[pyarrow]',
+    'abstract': 'string[pyarrow]',
+    # Few unique journal names, so dictionary-encode while parsing
+    'journal': 'category',
+    'source_x': 'category',
+}
+
+# Parquet caches are tagged with this version and rebuilt when it changes;
+# bump it whenever METADATA_DTYPES or _clean_frame change what is cached
+CACHE_VERSION = '3'
+CACHE_VERSION_KEY = b'cord19_cache_version'
+
+# Columns _clean_frame adds or replaces; only these go in the cleaned cache
+CLEAN_COLUMNS = ['publish_time', 'year', 'abstract_word_count', 'journal_clean']
+
+# Words left out of title word counts and word clouds
+TITLE_STOPWORDS = frozenset(STOPWORDS) | frozenset([
+    'the', 'of', 'and', 'in', 'to', 'a', 'for', 'with', 'on', 'at', 'from',
+    'by', 'an', 'be', 'that', 'this', 'is', 'are', 'as', 'or', 'was', 'were',
+    'covid', '19', 'sars', 'cov', '2', 'coronavirus', 'pandemic'
+])
+
+# Runs of 3+ Unicode letters, so accented words in French, Spanish and German
+# titles stay whole instead of splitting into ASCII fragments
+TITLE_WORD_RE = re.compile(r'[^\W\d_]{3,}')
+
+def count_title_words(titles):
+    """Count lowercase title words of 3+ letters, excluding TITLE_STOPWORDS, most common first"""
+    # A Counter over per-title matches avoids explode(), which builds a Python
+    # object per token and is about twice as slow here
+    counts = Counter(chain.from_iterable(map(TITLE_WORD_RE.findall, titles.dropna().str.lower())))
+    for stopword in TITLE_STOPWORDS & counts.keys():
+        del counts[stopword]
+    return pd.Series(dict(counts.most_common()), name='count', dtype='int64').rename_axis('title')
+
 class CORD19Analyzer:
     def __init__(self, file_path='metadata.csv'):
         self.file_path = file_path
+        # Parquet caches written next to the CSV so later runs skip CSV parsing
+        base_path = os.path.splitext(file_path)[0]
+        self.cache_path = base_path + '.parquet'
+        self.clean_cache_path = base_path + '_clean.parquet'
         self.df = None
         self.df_clean = None
+        self.missing_summary = None
+        self.dtypes_cache = None
+        self.year_min = None
+        self.year_max = None
+        # Only set by load_and_aggregate (low-memory mode)
+        self.aggregates = None
         
+    def _cache_is_fresh(self, cache_path):
+        """Check that a Parquet cache exists, has the current CACHE_VERSION and is not older than the CSV"""
+        if not os.path.exists(cache_path):
+            return False
+        try:
+            metadata = pq.read_schema(cache_path).metadata or {}
+        except (OSError, pa.ArrowException):
+            return False
+        if metadata.get(CACHE_VERSION_KEY) != CACHE_VERSION.encode():
+            return False
+        if not os.path.exists(self.file_path):
+            return True
+        return os.path.getmtime(cache_path) >= os.path.getmtime(self.file_path)
+    
+    def _write_cache(self, df, cache_path):
+        """Write a dataframe to a Parquet cache tagged with CACHE_VERSION, ignoring unwritable locations"""
+        table = pa.Table.from_pandas(df)
+        metadata = {**(table.schema.metadata or {}), CACHE_VERSION_KEY: CACHE_VERSION.encode()}
+        try:
+            pq.write_table(table.replace_schema_metadata(metadata), cache_path, compression='zstd')
+        except OSError as e:
+            print(f"Could not write cache {cache_path}: {e}")
+    
     def load_data(self):
-        """Load the metadata CSV file"""
+        """Load the metadata, preferring the Parquet cache over the CSV file"""
         try:
-            self.df = pd.read_csv(self.file_path)
+            if self._cache_is_fresh(self.cache_path):
+                self.df = pd.read_parquet(self.cache_path, engine='pyarrow', columns=METADATA_COLUMNS)
+            else:
+                self.df = pd.read_csv(
+                    self.file_path,
+                    usecols=METADATA_COLUMNS,
+                    dtype=METADATA_DTYPES,
+                    parse_dates=['publish_time'],
+                    engine='pyarrow',
+                    dtype_backend='pyarrow'
+                )
+                self._write_cache(self.df, self.cache_path)
             print(f"Dataset loaded successfully: {self.df.shape[0]} rows, {self.df.shape[1]} columns")
             return True
         except FileNotFoundError:
             print(f"File {self.file_path} not found. Please check the file path.")
             return False
     
+    def load_preview(self, nrows=10_000):
+        """Load only the first nrows rows of the CSV for a quick look at the data"""
+        try:
+            self.df = pd.read_csv(
+                self.file_path,
+                usecols=METADATA_COLUMNS,
+                dtype=METADATA_DTYPES,
+                parse_dates=['publish_time'],
+                nrows=nrows
+            )
+        except FileNotFoundError:
+            print(f"File {self.file_path} not found. Please check the file path.")
+            return False
+        
+        self.missing_summary = self.df.isnull().sum()
+        self.dtypes_cache = self.df.dtypes
+        print(f"Preview loaded: {self.df.shape[0]} rows, {self.df.shape[1]} columns")
+        return True
+    
+    def load_and_aggregate(self, chunksize=200_000, sample_size=1000):
+        """Stream the CSV in chunks, keeping only the aggregates the app needs
+        
+        Peak memory is bounded by one chunk instead of the whole file. Counts are
+        stored in self.aggregates, and self.df / self.df_clean hold a uniform
+        random sample of sample_size rows for displaying raw data.
+        """
+        yearly, journals, sources, title_words = Counter(), Counter(), Counter(), Counter()
+        missing_summary = None
+        n_rows = 0
+        sample = None
+        rng = np.random.default_rng(0)
+        
+        try:
+            chunks = pd.read_csv(
+                self.file_path,
+                usecols=METADATA_COLUMNS,
+                dtype=METADATA_DTYPES,
+                parse_dates=['publish_time'],
+                chunksize=chunksize
+            )
+            for chunk in chunks:
+                n_rows += len(chunk)
+                chunk_missing = chunk.isnull().sum()
+                missing_summary = chunk_missing if missing_summary is None else missing_summary + chunk_missing
+                if self.dtypes_cache is None:
+                    self.dtypes_cache = chunk.dtypes
+                
+                chunk_clean = self._clean_frame(chunk)
+                yearly.update(chunk_clean['year'].value_counts().to_dict())
+                journals.update(chunk_clean['journal_clean'].value_counts().to_dict())
+                sources.update(chunk_clean['source_x'].value_counts().to_dict())
+                title_words.update(count_title_words(chunk_clean['title']).to_dict())
+                
+                # Reservoir sample: keep the rows with the smallest random keys seen so far
+                chunk = chunk.assign(_sample_key=rng.random(len(chunk)))
+                sample = chunk if sample is None else pd.concat([sample, chunk])
+                sample = sample.nsmallest(sample_size, '_sample_key')
+        except FileNotFoundError:
+            print(f"File {self.file_path} not found. Please check the file path.")
+            return False
+        
+        if sample is None:
+            # The file exists but has only a header; not a missing-file error
+            raise ValueError(f"File {self.file_path} contains no rows.")
+        
+        self.missing_summary = missing_summary
+        self.df = sample.sort_index().drop(columns='_sample_key')
+        self.df_clean = self._clean_frame(self.df)
+        self.year_min = int(min(yearly))
+        self.year_max = int(max(yearly))
+        self.aggregates = {
+            'n_rows': n_rows,
+            'yearly_counts': pd.Series(yearly, name='count').rename_axis('year').sort_index(),
+            'journal_counts': self._counts_series(journals, 'journal_clean'),
+            'source_counts': self._counts_series(sources, 'source_x'),
+            'title_word_counts': self._counts_series(title_words, 'title'),
+        }
+        print(f"Dataset aggregated in chunks: {n_rows} rows, {len(METADATA_COLUMNS)} columns")
+        return True
+    
+    def _counts_series(self, counter, name):
+        """Turn a Counter into a value_counts-style Series, most common first"""
+        counts = pd.Series(counter, name='count', dtype='int64').rename_axis(name)
+        return counts[counts > 0].sort_values(ascending=False)
+    
     def basic_exploration(self):
         """Perform basic data exploration"""
         if self.df is None:
@@ -55,26 +231,74 @@ class CORD19Analyzer:
             print("Please load data first")
             return
             
-        # Create a copy for cleaning
-        self.df_clean = self.df.copy()
+        # Summaries of the raw data shown by the app, computed once
+        self.missing_summary = self.df.isnull().sum()
+        self.dtypes_cache = self.df.dtypes
         
-        # Handle publication dates
-        self.df_clean['publish_time'] = pd.to_datetime(self.df_clean['publish_time'], errors='coerce')
-        self.df_clean['year'] = self.df_clean['publish_time'].dt.year
+        # Reuse the derived columns from a previous run if they are still valid;
+        # the raw columns stay shared with self.df rather than being re-read
+        clean_columns = None
+        if self._cache_is_fresh(self.clean_cache_path):
+            clean_columns = pd.read_parquet(self.clean_cache_path, engine='pyarrow')
+            if len(clean_columns) != len(self.df):
+                clean_columns = None
         
-        # Fill missing years with 2020 (most common year for COVID papers)
-        self.df_clean['year'] = self.df_clean['year'].fillna(2020)
+        if clean_columns is not None:
+            self.df_clean = self.df.assign(**{col: clean_columns[col] for col in CLEAN_COLUMNS})
+            print(f"Cleaned dataset loaded from cache: {self.df_clean.shape}")
+        else:
+            self.df_clean = self._clean_frame(self.df)
+            self._write_cache(self.df_clean[CLEAN_COLUMNS], self.clean_cache_path)
+            
+            print("Data cleaning completed!")
+            print(f"Cleaned dataset shape: {self.df_clean.shape}")
         
-        # Create abstract word count
-        self.df_clean['abstract_word_count'] = self.df_clean['abstract'].apply(
-            lambda x: len(str(x).split()) if pd.notnull(x) else 0
-        )
+        # Year range used by the app's slider and summaries, computed once
+        self.year_min = int(self.df_clean['year'].min())
+        self.year_max = int(self.df_clean['year'].max())
+    
+    def _clean_frame(self, df):
+        """Return a cleaned version of a raw metadata frame (whole file or one chunk)
+        
+        Derived columns are added with assign() rather than on a full copy; with
+        Copy-on-Write the untouched raw columns are shared with df.
+        """
+        # Handle publication dates (parsed at read time unless the column has mixed formats).
+        # An explicit format keeps bare years like '2019' and full dates parsing the
+        # same way whether df is the whole file or one chunk; without it the format
+        # is guessed from each input's first value.
+        publish_time = df['publish_time']
+        if not pd.api.types.is_datetime64_any_dtype(publish_time):
+            publish_time = pd.to_datetime(publish_time, format='ISO8601', errors='coerce')
         
-        # Clean journal names
-        self.df_clean['journal_clean'] = self.df_clean['journal'].str.lower().str.strip()
+        # Clean journal names on the unique categories rather than every row;
+        # names that only differ by case/whitespace are merged by remapping codes.
+        # journal is read as a categorical, so astype() is normally a no-op.
+        journals = df['journal'].astype('category')
+        categories = journals.cat.categories
+        if len(categories) == 0:
+            # All journals missing: empty categories come back as a float index
+            categories = categories.astype(str)
+        clean_names = categories.str.lower().str.strip()
+        clean_categories = clean_names.unique()
+        # The extra trailing -1 maps missing journals (code -1) to missing
+        new_codes = np.append(clean_categories.get_indexer(clean_names), -1)
+        codes = journals.cat.codes.to_numpy()
+        journal_clean = pd.Categorical.from_codes(new_codes[codes], categories=clean_categories)
         
-        print("Data cleaning completed!")
-        print(f"Cleaned dataset shape: {self.df_clean.shape}")
+        return df.assign(
+            publish_time=publish_time,
+            # Fill missing years with 2020 (most common year for COVID papers);
+            # years fit in int16 and word counts in int32
+            year=publish_time.dt.year.fillna(2020).astype('int16'),
+            # Create abstract word count (a plain split beats the str.count regex here)
+            abstract_word_count=df['abstract'].apply(
+                lambda x: len(str(x).split()) if pd.notnull(x) else 0
+            ).astype('int32'),
+            journal_clean=journal_clean,
+            # Low-cardinality columns as categoricals so counts work on integer codes
+            source_x=df['source_x'].astype('category')
+        )
         
     def analyze_publications_over_time(self):
         """Analyze publication trends over time"""
@@ -101,7 +325,8 @@ class CORD19Analyzer:
             print("Please clean data first")
             return
             
-        top_journals = self.df_clean['journal_clean'].value_counts().head(top_n)
+        # Partial top-k selection instead of sorting every journal
+        top_journals = self.df_clean.groupby('journal_clean', observed=True).size().nlargest(top_n)
         
         plt.figure(figsize=(12, 8))
         top_journals.plot(kind='barh', color='lightgreen')
@@ -118,21 +343,15 @@ class CORD19Analyzer:
             print("Please clean data first")
             return
             
-        # Combine all titles
-        titles = ' '.join(self.df_clean['title'].dropna().astype(str))
-        
-        # Remove common stopwords and clean text
-        stopwords = set(['the', 'of', 'and', 'in', 'to', 'a', 'for', 'with', 'on', 'at', 'from',
-                        'by', 'an', 'be', 'that', 'this', 'is', 'are', 'as', 'or', 'was', 'were',
-                        'covid', '19', 'sars', 'cov', '2', 'coronavirus', 'pandemic'])
+        # Count words once (stopwords removed) and lay out the cloud from the counts
+        word_counts = count_title_words(self.df_clean['title'])
         
         wordcloud = WordCloud(
             width=800, 
             height=400, 
             background_color='white',
-            stopwords=stopwords,
             max_words=100
-        ).generate(titles)
+        ).generate_from_frequencies(word_counts.head(100).to_dict())
         
         plt.figure(figsize=(12, 6))
         plt.imshow(wordcloud, interpolation='bilinear')
@@ -147,7 +366,7 @@ class CORD19Analyzer:
             print("Please clean data first")
             return
             
-        source_counts = self.df_clean['source_x'].value_counts().head(10)
+        source_counts = self.df_clean.groupby('source_x', observed=True).size().nlargest(10)
         
         plt.figure(figsize=(10, 8))
         plt.pie(source_counts.values, labels=source_counts.index, autopct='%1.1f%%')